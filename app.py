@@ -6,6 +6,7 @@ import altair as alt
 import numpy as np
 import csv  # 新增這個模組來處理 CSV 寫入
 from datetime import datetime
+from car_data import CAR_DB, ES300H_MARKET_DATA
 
 # ==========================================
 # 0. 全域設定 (必須放在第一行)
@@ -31,36 +32,23 @@ def save_lead(email, model, note="Waitlist"):
         writer = csv.writer(f)
         writer.writerow([timestamp, model, email, "Waitlist", note])
 
+@st.cache_resource(max_entries=1)
+def get_leads(path, mtime):
+    # 名單只在檔案更新 (mtime 改變) 時重讀，所有管理員 session 共用同一份
+    df_leads = pd.read_csv(path, on_bad_lines='skip')
+    return df_leads, df_leads.to_csv(index=False).encode('utf-8-sig')
+
 # ==========================================
 # 🚗 功能 A：Toyota TCO 精算機 (公開版)
 # ==========================================
 def page_toyota_tco():
-    # --- 數據庫 ---
-    car_db = {
-        "Corolla Cross": {
-            "gas_price": 760000, "hybrid_price": 880000, "battery": 49000,
-            "advice_gas": "適合年跑1萬公里以下，首選 2024 汽油版，租賃退役CP值最高。",
-            "advice_hybrid": "適合通勤族，首選 2022 年式，低於 45 萬通常是營業車。",
-        },
-        "RAV4": {
-            "gas_price": 950000, "hybrid_price": 1150000, "battery": 65000,
-            "advice_gas": "首選 2.0 旗艦。2.5 油電稅金一年多繳 5千，非高里程不划算。",
-            "advice_hybrid": "注意 2019-2020 車頂架漏水通病。建議找 2021 後出廠車型。",
-        },
-        "Altis": {
-            "gas_price": 650000, "hybrid_price": 780000, "battery": 49000,
-            "advice_gas": "強烈建議買 2019.3 後的 TNGA 世代 (12代)。操控性大升級。",
-            "advice_hybrid": "極高機率買到計程車退役。若不懂看車，建議買汽油版最安全。",
-        }
-    }
-
     # --- 初始化 State ---
     if 'submitted' not in st.session_state: st.session_state.submitted = False
 
     # --- 側邊欄參數 ---
     st.sidebar.header("⚙️ Toyota 參數設定")
     selected_model = st.sidebar.selectbox("請選擇車款", ["Corolla Cross", "RAV4", "Altis"])
-    params = car_db[selected_model]
+    params = CAR_DB[selected_model]
     
     gas_car_price = st.sidebar.number_input("⛽ 汽油版 - 入手價", value=params["gas_price"], step=10000)
     hybrid_car_price = st.sidebar.number_input("⚡ 油電版 - 入手價", value=params["hybrid_price"], step=10000)
@@ -80,13 +68,12 @@ def page_toyota_tco():
         if admin_pwd == "uc0088":  
             if os.path.exists(target_file):
                 try:
-                    # 🔥 加入 on_bad_lines='skip' 防止程式崩潰
-                    df_leads = pd.read_csv(target_file, on_bad_lines='skip')
+                    # 🔥 加入 on_bad_lines='skip' 防止程式崩潰 (全程序共用一份，檔案更新才重讀)
+                    df_leads, csv_data = get_leads(target_file, os.path.getmtime(target_file))
                     st.write(f"目前累積：{len(df_leads)} 筆")
                     st.dataframe(df_leads)
                     
                     # 下載按鈕
-                    csv_data = df_leads.to_csv(index=False).encode('utf-8-sig')
                     st.download_button(
                         "📥 下載 CSV 檔案",
                         csv_data,
@@ -226,17 +213,10 @@ def page_es300h_private():
     battery_cost = st.sidebar.number_input("大電池成本", value=65000)
     basic_maintenance = st.sidebar.number_input("年均保養費", value=12000)
 
-    # --- 模擬行情數據 (可隨時調整) ---
-    market_data = {
-        2025: 195, 2024: 168, 2023: 145, 2022: 128, 
-        2021: 115, 2020: 102, 2019: 90, 2018: 75, 
-        2017: 65, 2016: 58, 2015: 50
-    }
-
     # --- 核心運算 ---
     def calculate_tco(target_year):
         car_age = current_year - target_year
-        buy_price = market_data.get(target_year, 0) * 10000
+        buy_price = ES300H_MARKET_DATA.get(target_year, 0) * 10000
         if buy_price == 0: return None
         
         sell_price = buy_price * (0.90 ** years_to_keep) # 假設年跌 10%
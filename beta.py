@@ -1,11 +1,16 @@
 import streamlit as st
 import pandas as pd
 import os
-import math
 import altair as alt
 import numpy as np
 import csv
+import threading
+import time
+import uuid
 from datetime import datetime
+from listing_scan import load_listings, score_listings, freeze_frame, family_comps
+from car_data import CAR_DB, CAR_FMEA, ES300H_MARKET_DATA, get_resale_value, get_taxes, fmea_risk_costs, calc_final_tco
+from mem_stats import process_rss_bytes, deep_sizeof, format_bytes
 
 # ==========================================
 # 0. 全域設定 (必須放在第一行)
@@ -30,71 +35,56 @@ def save_lead(email, model, note="Waitlist"):
         writer = csv.writer(f)
         writer.writerow([timestamp, model, email, "Waitlist", note])
 
+# ==========================================
+# 🔎 共用工具函式 (cars.csv 實價行情掃描)
+# ==========================================
+# 選單車款 -> cars.csv 裡的車系名稱
+MODEL_FAMILY = {"Corolla Cross": "COROLLA CROSS", "RAV4": "RAV4", "Altis": "ALTIS"}
+
+@st.cache_resource
+def get_scored_listings(path="cars.csv"):
+    # 整份 cars.csv 一次向量化評分；cache_resource 讓全程序共用同一份，凍結成唯讀
+    return freeze_frame(score_listings(load_listings(path)))
+
+# ==========================================
+# 📏 共用工具函式 (記憶體帳本 - 管理員後台用)
+# ==========================================
+SESSION_IDLE_SECONDS = 30 * 60   # 超過 30 分鐘沒互動的 session 不列入統計
+
+@st.cache_resource
+def get_session_registry():
+    # 全程序共用：session_id -> (最後互動時間, session_state 佔用 bytes)
+    # baseline_rss：第一個 session 進來時的 RSS，之後的增量才算到 session 頭上
+    return {"lock": threading.Lock(), "sessions": {}, "baseline_rss": process_rss_bytes()}
+
+@st.cache_resource(max_entries=1)
+def get_leads(path, mtime):
+    # 名單只在檔案更新 (mtime 改變) 時重讀，所有管理員 session 共用同一份
+    df_leads = pd.read_csv(path, on_bad_lines='skip')
+    return df_leads, df_leads.to_csv(index=False).encode('utf-8-sig')
+
+def track_session_memory():
+    if 'session_id' not in st.session_state: st.session_state.session_id = uuid.uuid4().hex
+    size = deep_sizeof({k: st.session_state[k] for k in st.session_state})
+
+    registry = get_session_registry()
+    now = time.time()
+    with registry["lock"]:
+        sessions = registry["sessions"]
+        sessions[st.session_state.session_id] = (now, size)
+        for sid, (last_seen, _) in list(sessions.items()):
+            if now - last_seen > SESSION_IDLE_SECONDS: del sessions[sid]
+
 # ==========================================
 # 🚗 功能 A：Toyota TCO 精算機 (摺疊衝擊版)
 # ==========================================
 def page_toyota_tco():
-    # --- 1. 基礎數據庫 ---
-    car_db = {
-        "Corolla Cross": {
-            "gas_price": 760000, "hybrid_price": 880000, "battery": 49000,
-            "advice_gas": "適合年跑1萬公里以下，首選 2024 汽油版，租賃退役CP值最高。",
-            "advice_hybrid": "適合通勤族，首選 2022 年式，低於 45 萬通常是營業車。",
-        },
-        "RAV4": {
-            "gas_price": 950000, "hybrid_price": 1150000, "battery": 65000,
-            "advice_gas": "首選 2.0 旗艦。2.5 油電稅金一年多繳 5千，非高里程不划算。",
-            "advice_hybrid": "注意 2019-2020 車頂架漏水通病。建議找 2021 後出廠車型。",
-        },
-        "Altis": {
-            "gas_price": 650000, "hybrid_price": 780000, "battery": 49000,
-            "advice_gas": "強烈建議買 2019.3 後的 TNGA 世代 (12代)。操控性大升級。",
-            "advice_hybrid": "極高機率買到計程車退役。若不懂看車，建議買汽油版最安全。",
-        }
-    }
-
-    # --- 2. 航太級 FMEA 數據庫 ---
-    car_fmea = {
-        "Corolla Cross": [
-            {
-                "years": "2020~2022", 
-                "part": "車頂架密封失效 (Roof Leak)",
-                "s": 7, "o": 3, "d": 2, "cost": 6500, "target": "both",
-                "eng_note": "【技術鑑定】應力集中導致防水墊片形變，引發流體滲漏風險。",
-                "check_guide": "⚠️ 買車時請檢查：A柱與頂棚交接處是否有『黃褐色水痕』或『霉味』。"
-            },
-            {
-                "years": "2020~2024", 
-                "part": "K120 CVT 變速箱頓挫",
-                "s": 3, "o": 2, "d": 1, "cost": 85000, "target": "gas",
-                "eng_note": "【技術鑑定】Direct Shift CVT 啟動齒輪切換至鋼帶之過渡特性。",
-                "check_guide": "⚠️ 試駕重點：低速 20-40km/h 收油再踩油門時，是否有明顯『拉扯感』。"
-            }
-        ],
-        "RAV4": [
-            {
-                "years": "2019~2021", 
-                "part": "車頂架嚴重漏水",
-                "s": 7, "o": 5, "d": 2, "cost": 8000, "target": "both",
-                "eng_note": "【技術鑑定】固定扣具密封圈疲勞失效，水分侵入 A/B 柱氣囊區域。",
-                "check_guide": "⚠️ 買車必看：拆開後車廂備胎室，檢查底部是否有積水或鏽蝕痕跡。"
-            },
-            {
-                "years": "2019~2022", 
-                "part": "HV 高壓電纜接頭腐蝕",
-                "s": 9, "o": 3, "d": 8, "cost": 65000, "target": "hybrid",
-                "eng_note": "【技術鑑定】電化學腐蝕導致接頭阻抗過大，失效將觸發系統停機。",
-                "check_guide": "⚠️ 頂高底盤檢查：橘色高壓電線連接馬達處，金屬編織網是否『發黑或綠粉』。"
-            }
-        ]
-    }
-
     if 'submitted' not in st.session_state: st.session_state.submitted = False
 
     # --- 側邊欄參數 ---
     st.sidebar.header("⚙️ Toyota 參數設定")
     selected_model = st.sidebar.selectbox("請選擇車款", ["Corolla Cross", "RAV4", "Altis"])
-    params = car_db[selected_model]
+    params = CAR_DB[selected_model]
     
     gas_car_price = st.sidebar.number_input("⛽ 汽油版 - 入手價", value=params["gas_price"], step=10000)
     hybrid_car_price = st.sidebar.number_input("⚡ 油電版 - 入手價", value=params["hybrid_price"], step=10000)
@@ -113,25 +103,46 @@ def page_toyota_tco():
         if admin_pwd == "uc0088":  
             if os.path.exists(target_file):
                 try:
-                    df_leads = pd.read_csv(target_file, on_bad_lines='skip')
+                    df_leads, csv_data = get_leads(target_file, os.path.getmtime(target_file))
                     st.write(f"目前累積：{len(df_leads)} 筆")
-                    csv_data = df_leads.to_csv(index=False).encode('utf-8-sig')
                     st.download_button("📥 下載 CSV", csv_data, "leads_v2.csv", "text/csv")
                 except: st.error("讀取錯誤")
             else: st.warning("資料庫為空")
 
+            # --- 記憶體帳本 (估算 replica 容量) ---
+            registry = get_session_registry()
+            with registry["lock"]:
+                session_sizes = [size for _, size in registry["sessions"].values()]
+                my_size = registry["sessions"].get(st.session_state.get('session_id'), (0, 0))[1]
+            shared_size = deep_sizeof([CAR_DB, CAR_FMEA, ES300H_MARKET_DATA])
+            if os.path.exists("cars.csv"): shared_size += deep_sizeof(get_scored_listings())
+
+            # session_state 只是輸入值，表格 / 圖表的傳輸資料不在裡面；
+            # 真正的每人成本用 (RSS - 啟動時 RSS - 共用資料) ÷ 活躍 session 估算
+            rss = process_rss_bytes()
+            per_session = None
+            if rss is not None and registry["baseline_rss"] is not None and session_sizes:
+                per_session = max(rss - registry["baseline_rss"] - shared_size, 0) / len(session_sizes)
+
+            st.markdown("**📏 記憶體帳本**")
+            st.write(f"程序常駐記憶體 (RSS)：{format_bytes(rss)}")
+            st.write(f"共用參考資料：{format_bytes(shared_size)}")
+            st.write(f"活躍 session：{len(session_sizes)} 個")
+            st.write(f"每 session 實際佔用 (估算)：{format_bytes(per_session)}")
+            st.write(f"本 session 的 session_state (僅輸入值)：{format_bytes(my_size)}，全部 session 合計 {format_bytes(sum(session_sizes))}")
+            st.caption("估算值 = (目前 RSS − 啟動時 RSS − 共用資料) ÷ 活躍 session；replica 容量 ≈ (記憶體上限 − 啟動 RSS − 共用資料) ÷ 每 session 佔用。")
+
     # --- 主畫面 ---
     st.title(f"✈️ 航太工程師的 {selected_model} 購車精算機")
     st.caption("運用航太級 TCO 模型，幫您算出符合數學邏輯的最佳選擇。")
 
     # --- 🔥 FMEA 通病雷達 (摺疊衝擊版) ---
-    fmea_cost_gas = 0
-    fmea_cost_hybrid = 0
+    fmea_cost_gas, fmea_cost_hybrid = fmea_risk_costs(selected_model)
 
-    if selected_model in car_fmea:
+    if selected_model in CAR_FMEA:
         # 計算一下總風險金額，放在標題吸引人點擊
         total_risk_preview = 0
-        for i in car_fmea[selected_model]:
+        for i in CAR_FMEA[selected_model]:
             total_risk_preview += i['cost']
 
         # 這裡就是你要的「摺疊」效果，預設 expanded=False (關閉)
@@ -139,18 +150,9 @@ def page_toyota_tco():
             
             st.info("💡 根據航太維修數據分析，這年份的車可能有以下通病。")
             
-            for issue in car_fmea[selected_model]:
-                # 計算 RPN 與 成本
+            for issue in CAR_FMEA[selected_model]:
+                # 計算 RPN
                 rpn = issue['s'] * issue['o'] * issue['d']
-                expected_cost = int(issue['cost'] * (issue['o'] / 10.0))
-                
-                if issue['target'] == 'both':
-                    fmea_cost_gas += expected_cost
-                    fmea_cost_hybrid += expected_cost
-                elif issue['target'] == 'gas':
-                    fmea_cost_gas += expected_cost
-                elif issue['target'] == 'hybrid':
-                    fmea_cost_hybrid += expected_cost
 
                 # 視覺化卡片
                 is_severe = rpn > 100 or issue['cost'] > 20000
@@ -171,25 +173,18 @@ def page_toyota_tco():
             
             # 專業數據也藏在裡面，變成第二層摺疊
             with st.expander("🛠️ 查看航太工程師 FMEA 原始數據 (Engineering Data)"):
-                st.table(pd.DataFrame(car_fmea[selected_model]).drop(columns=['check_guide']))
+                st.table(pd.DataFrame([dict(i) for i in CAR_FMEA[selected_model]]).drop(columns=['check_guide']))
 
         if force_risk:
             st.caption(f"💡 系統已自動將上述風險成本加入試算：汽油版 +${fmea_cost_gas:,} / 油電版 +${fmea_cost_hybrid:,}")
 
     # --- TCO 計算邏輯 ---
-    def get_resale_value(initial_price, year, car_type):
-        k = 0.096 if car_type == 'gas' else 0.104
-        initial_drop = 0.82 if car_type == 'gas' else 0.80 
-        if year <= 1: return initial_price * initial_drop
-        else: return (initial_price * initial_drop) * math.exp(-k * (year - 1))
-
     chart_data_rows = []
     cross_point = None
     prev_diff = None
     prev_g_total = 0
     calc_range = years_to_keep + 3
-    tax_gas = 17410 if selected_model == "RAV4" else 11920
-    tax_hybrid = 22410 if selected_model == "RAV4" else 11920
+    tax_gas, tax_hybrid = get_taxes(selected_model)
 
     for y in range(0, calc_range):
         g_resale = get_resale_value(gas_car_price, y, 'gas')
@@ -221,19 +216,12 @@ def page_toyota_tco():
     chart_df = pd.DataFrame(chart_data_rows)
     
     # 最終 TCO 計算
-    total_km = annual_km * years_to_keep
-    is_battery_included = (total_km > 160000 or years_to_keep > 8)
-    
     final_risk_g = fmea_cost_gas if force_risk else 0
     final_risk_h = fmea_cost_hybrid if force_risk else 0
 
-    g_resale_final = get_resale_value(gas_car_price, years_to_keep, 'gas')
-    h_resale_final = get_resale_value(hybrid_car_price, years_to_keep, 'hybrid')
-    
-    tco_gas = (gas_car_price - g_resale_final) + ((total_km / 12.0) * gas_price) + (tax_gas * years_to_keep) + final_risk_g
-    tco_hybrid = (hybrid_car_price - h_resale_final) + ((total_km / 21.0) * gas_price) + (tax_hybrid * years_to_keep) + (battery_cost if is_battery_included else 0) + final_risk_h
-    
-    diff = tco_gas - tco_hybrid
+    tco = calc_final_tco(selected_model, gas_car_price, hybrid_car_price, annual_km, years_to_keep,
+                         gas_price, battery_cost, final_risk_g, final_risk_h)
+    tco_gas, tco_hybrid, diff = tco["tco_gas"], tco["tco_hybrid"], tco["diff"]
 
     # --- 戰情室 ---
     st.subheader("📊 決策戰情室")
@@ -267,6 +255,30 @@ def page_toyota_tco():
         st.altair_chart(lines.interactive(), use_container_width=True)
         st.caption("📍 此設定下無黃金交叉點。")
 
+    # --- 實價行情比對 (低價車 / 營業車偵測) ---
+    st.subheader(f"🔎 {selected_model} 實價行情比對")
+    st.caption("依車齡、里程、評價建立行情模型；偏離% 為實際價格相對模型預估的差距，年均里程過高視為計程車 / 營業車。")
+    col_g, col_h = st.columns(2)
+    # 汽油 / 油電分開列，直接對照上方的經驗法則
+    for col, is_hybrid, label, advice in ((col_g, False, "⛽ 汽油版", params['advice_gas']), (col_h, True, "⚡ 油電版", params['advice_hybrid'])):
+        with col:
+            st.info(f"{label}：{advice}")
+            if not os.path.exists("cars.csv"): continue
+            comps = family_comps(get_scored_listings(), MODEL_FAMILY[selected_model], hybrid=is_hybrid)
+            flagged = comps[comps["警示"] != ""]
+            st.write(f"共 {len(comps)} 筆實價，其中 **{len(flagged)} 筆**疑似營業車 / 價格異常")
+            with st.expander(f"📋 {label} 實價明細 (點擊展開)", expanded=False):
+                st.dataframe(
+                    comps[["車款名稱", "價格", "里程", "評價", "年均里程", "預估行情", "偏離%", "警示"]],
+                    hide_index=True,
+                    column_config={
+                        "價格": st.column_config.NumberColumn(format="$%d"),
+                        "里程": st.column_config.NumberColumn(format="%d km"),
+                        "年均里程": st.column_config.NumberColumn(format="%d km"),
+                        "預估行情": st.column_config.NumberColumn(format="$%d"),
+                    },
+                )
+
     # --- 服務公告區 ---
     st.markdown("---")
     st.warning("⚠️ **服務公告：目前諮詢量額滿，暫停即時報價**")
@@ -310,15 +322,9 @@ def page_es300h_private():
     battery_cost = st.sidebar.number_input("大電池成本", value=65000)
     basic_maintenance = st.sidebar.number_input("年均保養費", value=12000)
 
-    market_data = {
-        2025: 195, 2024: 168, 2023: 145, 2022: 128, 
-        2021: 115, 2020: 102, 2019: 90, 2018: 75, 
-        2017: 65, 2016: 58, 2015: 50
-    }
-
     def calculate_tco(target_year):
         car_age = current_year - target_year
-        buy_price = market_data.get(target_year, 0) * 10000
+        buy_price = ES300H_MARKET_DATA.get(target_year, 0) * 10000
         if buy_price == 0: return None
         
         sell_price = buy_price * (0.90 ** years_to_keep) 
@@ -366,6 +372,7 @@ def page_es300h_private():
 # 🕹️ 主程式導航
 # ==========================================
 def main():
+    track_session_memory()
     st.sidebar.title("✈️ 實驗室導航")
     
     page = st.sidebar.radio(
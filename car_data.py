@@ -0,0 +1,128 @@
+import math
+from types import MappingProxyType
+
+# ==========================================
+# 📚 共用參考資料 (網頁 beta.py 與批次報告 report_batch.py 共用)
+# ==========================================
+# 整個程序只保留一份，所有 session 共用；建立後凍結成唯讀，避免任何頁面不小心改到別人的資料。
+def _freeze(obj):
+    if isinstance(obj, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in obj.items()})
+    if isinstance(obj, list):
+        return tuple(_freeze(v) for v in obj)
+    return obj
+
+
+# --- 1. 基礎數據庫 ---
+CAR_DB = _freeze({
+    "Corolla Cross": {
+        "gas_price": 760000, "hybrid_price": 880000, "battery": 49000,
+        "advice_gas": "適合年跑1萬公里以下，首選 2024 汽油版，租賃退役CP值最高。",
+        "advice_hybrid": "適合通勤族，首選 2022 年式，低於 45 萬通常是營業車。",
+    },
+    "RAV4": {
+        "gas_price": 950000, "hybrid_price": 1150000, "battery": 65000,
+        "advice_gas": "首選 2.0 旗艦。2.5 油電稅金一年多繳 5千，非高里程不划算。",
+        "advice_hybrid": "注意 2019-2020 車頂架漏水通病。建議找 2021 後出廠車型。",
+    },
+    "Altis": {
+        "gas_price": 650000, "hybrid_price": 780000, "battery": 49000,
+        "advice_gas": "強烈建議買 2019.3 後的 TNGA 世代 (12代)。操控性大升級。",
+        "advice_hybrid": "極高機率買到計程車退役。若不懂看車，建議買汽油版最安全。",
+    }
+})
+
+# --- 2. 航太級 FMEA 數據庫 ---
+CAR_FMEA = _freeze({
+    "Corolla Cross": [
+        {
+            "years": "2020~2022", 
+            "part": "車頂架密封失效 (Roof Leak)",
+            "s": 7, "o": 3, "d": 2, "cost": 6500, "target": "both",
+            "eng_note": "【技術鑑定】應力集中導致防水墊片形變，引發流體滲漏風險。",
+            "check_guide": "⚠️ 買車時請檢查：A柱與頂棚交接處是否有『黃褐色水痕』或『霉味』。"
+        },
+        {
+            "years": "2020~2024", 
+            "part": "K120 CVT 變速箱頓挫",
+            "s": 3, "o": 2, "d": 1, "cost": 85000, "target": "gas",
+            "eng_note": "【技術鑑定】Direct Shift CVT 啟動齒輪切換至鋼帶之過渡特性。",
+            "check_guide": "⚠️ 試駕重點：低速 20-40km/h 收油再踩油門時，是否有明顯『拉扯感』。"
+        }
+    ],
+    "RAV4": [
+        {
+            "years": "2019~2021", 
+            "part": "車頂架嚴重漏水",
+            "s": 7, "o": 5, "d": 2, "cost": 8000, "target": "both",
+            "eng_note": "【技術鑑定】固定扣具密封圈疲勞失效，水分侵入 A/B 柱氣囊區域。",
+            "check_guide": "⚠️ 買車必看：拆開後車廂備胎室，檢查底部是否有積水或鏽蝕痕跡。"
+        },
+        {
+            "years": "2019~2022", 
+            "part": "HV 高壓電纜接頭腐蝕",
+            "s": 9, "o": 3, "d": 8, "cost": 65000, "target": "hybrid",
+            "eng_note": "【技術鑑定】電化學腐蝕導致接頭阻抗過大，失效將觸發系統停機。",
+            "check_guide": "⚠️ 頂高底盤檢查：橘色高壓電線連接馬達處，金屬編織網是否『發黑或綠粉』。"
+        }
+    ]
+})
+# --- 3. Lexus ES300h 模擬行情 (萬元) ---
+ES300H_MARKET_DATA = _freeze({
+    2025: 195, 2024: 168, 2023: 145, 2022: 128,
+    2021: 115, 2020: 102, 2019: 90, 2018: 75,
+    2017: 65, 2016: 58, 2015: 50
+})
+
+
+# ==========================================
+# 🧮 共用計算函式
+# ==========================================
+def get_resale_value(initial_price, year, car_type):
+    k = 0.096 if car_type == 'gas' else 0.104
+    initial_drop = 0.82 if car_type == 'gas' else 0.80
+    if year <= 1: return initial_price * initial_drop
+    else: return (initial_price * initial_drop) * math.exp(-k * (year - 1))
+
+
+def get_taxes(model):
+    # 回傳 (汽油版, 油電版) 每年稅金
+    tax_gas = 17410 if model == "RAV4" else 11920
+    tax_hybrid = 22410 if model == "RAV4" else 11920
+    return tax_gas, tax_hybrid
+
+
+def fmea_expected_cost(issue):
+    # 期望損失 = 維修金額 x 發生率 (O/10)
+    return int(issue['cost'] * (issue['o'] / 10.0))
+
+
+def fmea_risk_costs(model):
+    # 回傳 (汽油版, 油電版) 的 FMEA 通病期望成本
+    cost_gas = 0
+    cost_hybrid = 0
+    for issue in CAR_FMEA.get(model, []):
+        expected_cost = fmea_expected_cost(issue)
+        if issue['target'] in ('both', 'gas'):
+            cost_gas += expected_cost
+        if issue['target'] in ('both', 'hybrid'):
+            cost_hybrid += expected_cost
+    return cost_gas, cost_hybrid
+
+
+def calc_final_tco(model, gas_car_price, hybrid_car_price, annual_km, years_to_keep,
+                   gas_price, battery_cost, risk_gas=0, risk_hybrid=0):
+    tax_gas, tax_hybrid = get_taxes(model)
+    total_km = annual_km * years_to_keep
+    is_battery_included = (total_km > 160000 or years_to_keep > 8)
+
+    g_resale_final = get_resale_value(gas_car_price, years_to_keep, 'gas')
+    h_resale_final = get_resale_value(hybrid_car_price, years_to_keep, 'hybrid')
+
+    tco_gas = (gas_car_price - g_resale_final) + ((total_km / 12.0) * gas_price) + (tax_gas * years_to_keep) + risk_gas
+    tco_hybrid = (hybrid_car_price - h_resale_final) + ((total_km / 21.0) * gas_price) + (tax_hybrid * years_to_keep) + (battery_cost if is_battery_included else 0) + risk_hybrid
+
+    return {
+        "tco_gas": tco_gas, "tco_hybrid": tco_hybrid,
+        "diff": tco_gas - tco_hybrid, "is_battery_included": is_battery_included,
+    }
@@ -0,0 +1,161 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+# ==========================================
+# 🔎 實價行情掃描：低價車 / 營業車 / 計程車退役偵測
+# ==========================================
+# 把 car_db 裡「低於 45 萬通常是營業車」「極高機率買到計程車退役」這類經驗法則，
+# 換成對整份 cars.csv 的統計模型：
+#   log(價格) ~ 截距 + 車齡 + 里程 + 評價分數 + 油電
+# 每個車系各自一組係數，但所有車系在同一次批次 np.linalg.solve 裡一起解完。
+
+CURRENT_YEAR = 2026
+
+# 評價字母 -> 分數 (空白 / N 視為未評，補中間值)
+RATING_SCORE = {"A+": 5.0, "A": 4.0, "B+": 3.0, "B": 2.0, "C+": 1.5, "C": 1.0}
+RATING_DEFAULT = 3.0
+
+# 車名前面常見的品牌字樣，歸類車系時要拿掉
+BRAND_WORDS = {
+    "TOYOTA", "LEXUS", "HONDA", "NISSAN", "MITSUBISHI", "FORD", "MAZDA", "HYUNDAI",
+    "BENZ", "BMW", "AUDI", "VOLKSWAGEN", "VW", "SUZUKI", "SUBARU", "KIA", "LUXGEN",
+    "VOLVO", "PORSCHE", "SKODA", "PEUGEOT", "CITROEN", "INFINITI", "MINI",
+}
+# 兩個字才算完整車系的名稱 (COROLLA CROSS ≠ COROLLA SPORT)
+TWO_WORD_FAMILIES = {"COROLLA", "PRIUS", "TOWN", "LAND", "GRAND"}
+# Toyota 底盤代碼：字母 + 數字 + 字母 - 4 碼以上字母 (ZRE211L-GEXEKR、ZWE211L-GEXVBR)
+# CX-5、CX-30 這類真正的車名不能被當成代碼拿掉
+CHASSIS_CODE_RE = re.compile(r"[A-Z]{1,4}\d{1,3}[A-Z]{0,3}-[A-Z]{4,}")
+# 車名沒寫 HYBRID、只寫底盤代碼的油電車 (ZVG10L = Corolla Cross 油電、ZWE211L = Altis 油電…)
+HYBRID_CHASSIS_RE = r"\b(?:ZWE|ZVG|ZVW|ZYX|ZWR|NHP|AXAH|MXAH|AXVH|AVV|AHV|AYH|MXPH)\d{1,3}[A-Z]{0,3}-[A-Z]{4,}"
+
+RIDGE_LAMBDA = 1.0          # 小樣本車系避免矩陣奇異
+MIN_COMPS = 8               # 車系樣本數低於此值不做價格偏離判定
+UNDERPRICE_Z = -2.0         # 殘差低於 -2σ 視為價格異常偏低
+TAXI_KM_PER_YEAR = 40000    # 年均里程超過 4 萬公里：計程車 / 營業車等級
+FLEET_KM_PER_YEAR = 25000   # 價格偏低 + 年均 2.5 萬公里以上：疑似租賃 / 公務車
+
+
+def _family_of(name):
+    tokens = [t for t in name.split() if re.fullmatch(r"[A-Z0-9.+\-]+", t)]
+    # 拿掉底盤代碼 (ZWE211L-GEXVBR 這類)
+    tokens = [t for t in tokens if not CHASSIS_CODE_RE.fullmatch(t)]
+    while len(tokens) > 1 and tokens[0] in BRAND_WORDS:
+        tokens = tokens[1:]
+    if not tokens:
+        return ""
+    head = re.sub(r"^(TOYOTA|LEXUS)(?=[A-Z0-9])", "", tokens[0])
+    if head in TWO_WORD_FAMILIES and len(tokens) > 1:
+        return f"{head} {tokens[1]}"
+    return head
+
+
+def load_listings(path="cars.csv"):
+    raw = pd.read_csv(path, encoding="utf-8-sig", dtype=str).fillna("")
+    raw.columns = ["車款名稱", "成本底價", "備註"]
+
+    name = raw["車款名稱"].str.strip()
+    upper = name.str.upper()
+    note = raw["備註"]
+
+    df = pd.DataFrame({"車款名稱": name})
+    df["年份"] = pd.to_numeric(upper.str.extract(r"\((\d{4})\)")[0], errors="coerce")
+    df["油電"] = upper.str.contains("HYBRID", regex=False) | upper.str.contains(HYBRID_CHASSIS_RE, regex=True)
+    df["車系"] = (
+        upper.str.replace(r"\(\d{4}\)", " ", regex=True)
+        .str.replace("HYBRID", " ", regex=False)
+        .map(_family_of)
+    )
+    df["價格"] = pd.to_numeric(raw["成本底價"], errors="coerce")
+    km = note.str.extract(r"(?i)里程:\s*([\d,]+)\s*km")[0].str.replace(",", "", regex=False)
+    df["里程"] = pd.to_numeric(km, errors="coerce")
+    df["評價"] = note.str.extract(r"評價:\s*([A-Z+]*)")[0].fillna("")
+    return df
+
+
+def score_listings(df):
+    df = df.copy()
+    age = np.maximum(CURRENT_YEAR - df["年份"].to_numpy(dtype=float), 0.5)
+    km = df["里程"].to_numpy(dtype=float)
+    price = df["價格"].to_numpy(dtype=float)
+
+    df["車齡"] = age
+    df["年均里程"] = km / age
+
+    # 可用樣本：有年份、里程有填、價格合理；價格 == 里程 是 PDF 解析錯位，不納入
+    valid = (
+        np.isfinite(age) & np.isfinite(km) & (km >= 100)
+        & np.isfinite(price) & (price >= 10000) & (price != km)
+        & (df["車系"] != "").to_numpy()
+    )
+
+    codes, families = pd.factorize(df["車系"])
+    rating = df["評價"].map(RATING_SCORE).fillna(RATING_DEFAULT).to_numpy()
+
+    X = np.column_stack([
+        np.ones(len(df)), age, km / 10000.0, rating, df["油電"].to_numpy(dtype=float),
+    ])
+    y = np.log(np.where(valid, price, 1.0))
+    k = X.shape[1]
+
+    # --- 每個車系的 XᵀX / Xᵀy 一次累加，再批次解 (G, k, k) 線性系統 ---
+    g = codes[valid]
+    Xv, yv = X[valid], y[valid]
+    n_groups = len(families)
+    xtx = np.zeros((n_groups, k, k))
+    xty = np.zeros((n_groups, k))
+    np.add.at(xtx, g, Xv[:, :, None] * Xv[:, None, :])
+    np.add.at(xty, g, Xv * yv[:, None])
+    ridge = np.eye(k) * RIDGE_LAMBDA
+    ridge[0, 0] = 1e-6   # 截距不懲罰
+    beta = np.linalg.solve(xtx + ridge, xty[:, :, None])[:, :, 0]
+
+    pred = np.einsum("nk,nk->n", X, beta[codes])
+    resid = np.where(valid, y - pred, np.nan)
+
+    counts = np.bincount(g, minlength=n_groups)
+    sse = np.bincount(g, weights=resid[valid] ** 2, minlength=n_groups)
+    sigma = np.sqrt(sse / np.maximum(counts - k, 1))
+    z = resid / np.where(sigma > 0, sigma, np.nan)[codes]
+    enough = counts[codes] >= MIN_COMPS
+
+    underpriced = valid & enough & (z < UNDERPRICE_Z)
+    taxi = valid & (df["年均里程"].to_numpy() > TAXI_KM_PER_YEAR)
+    fleet = underpriced & ~taxi & (df["年均里程"].to_numpy() > FLEET_KM_PER_YEAR)
+
+    df["預估行情"] = np.where(valid, np.exp(pred), np.nan).round(-3)
+    df["偏離%"] = np.round((np.exp(resid) - 1) * 100, 1)
+    df["價格偏低"] = underpriced
+    df["疑似營業車"] = taxi | fleet
+
+    flag = np.full(len(df), "", dtype=object)
+    flag[underpriced] = "💸 價格異常偏低"
+    flag[fleet] = "🚐 低價 + 高里程：疑似租賃/營業車"
+    flag[taxi] = "🚕 年均里程過高：疑似計程車/營業車"
+    flag[taxi & underpriced] = "🚕💸 高里程 + 低價：極可能計程車退役"
+    df["警示"] = flag
+    df["可用樣本"] = valid
+    return df
+
+
+def freeze_frame(df):
+    # 給全程序共用的快取用：數值 / 布林欄位底層陣列設成唯讀，就地修改會直接報錯
+    # (字串欄位 pandas 無法凍結，靠 family_comps 一律回傳複本保護)
+    cols = {}
+    for col in df.columns:
+        arr = df[col].to_numpy(copy=True)
+        if arr.dtype != object:
+            arr.flags.writeable = False
+        cols[col] = arr
+    return pd.DataFrame(cols, index=df.index, copy=False)
+
+
+def family_comps(scored, family, hybrid=None):
+    comps = scored[(scored["車系"] == family) & scored["可用樣本"]]
+    if hybrid is not None:
+        comps = comps[comps["油電"] == hybrid]
+    comps = comps.assign(_flagged=comps["警示"] != "")
+    # 一律回傳複本，呼叫端怎麼改都不會動到共用的 scored
+    return comps.sort_values(["_flagged", "偏離%"], ascending=[False, True]).drop(columns="_flagged").copy()
@@ -0,0 +1,292 @@
+import argparse
+import csv
+import hashlib
+import os
+import re
+import shutil
+import string
+import tempfile
+import threading
+import time
+from datetime import datetime
+from multiprocessing import Pool
+
+from fontTools import subset
+from fpdf import FPDF
+
+from car_data import CAR_DB, CAR_FMEA, fmea_expected_cost, fmea_risk_costs, calc_final_tco
+
+# ==========================================
+# 📄 候補名單批次報告：【{車款} 2026 Q1 獨家行情 + 避坑指南】
+# ==========================================
+# 用法：python report_batch.py --font NotoSansTC-Regular.ttf --workers 4
+# 只產生本機 PDF 檔，不負責寄信。
+#
+# 流程：
+#   1. 串流讀 leads_v2.csv，先找出名單裡有哪些車款
+#   2. 每個車款只算一次 TCO + FMEA 摘要 (不是每個人算一次)
+#   3. 摘要在 worker 啟動時送進去一次，之後每筆任務只傳 (email, 車款)
+#   4. 主程序先把字型裁成「報告會用到的字」的小字型檔，worker 每份 PDF 只載入小檔
+#   5. 同時在 pool 裡排隊的任務數有上限，記憶體跟名單長度無關，worker 也不會閒置
+
+LEADS_FILE = "leads_v2.csv"
+OUTPUT_DIR = "reports"
+DEFAULT_FONT = "NotoSansTC-Regular.ttf"   # 需要支援繁中的 TTF/OTF，請自行放在專案目錄
+REPORT_TITLE = "【{model} 2026 Q1 獨家行情 + 避坑指南】"
+
+# 報告用的試算條件 (與網頁側邊欄預設值相同)
+REPORT_INPUTS = {"annual_km": 15000, "years_to_keep": 10, "gas_price": 31.0, "force_risk": True}
+
+MAX_PENDING = 500           # 同時排隊中的任務上限
+PROGRESS_EVERY = 500        # 每產生幾份印一次進度
+MAX_TASKS_PER_CHILD = 1000  # worker 定期重生，避免長跑累積記憶體
+
+# 字型裡通常沒有 emoji，先拿掉避免缺字
+EMOJI_RE = re.compile("[\u2600-\u27BF\uFE0F\U0001F000-\U0001FFFF]")
+UNSAFE_NAME_RE = re.compile(r"[^A-Za-z0-9@._-]+")
+
+
+# ==========================================
+# 🧮 名單讀取 & 車款摘要 (主程序)
+# ==========================================
+def iter_leads(path=LEADS_FILE):
+    # 串流讀取，同一個 email + 車款只出一份報告；不在資料庫的車款略過
+    seen = set()
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        for row in csv.DictReader(f):
+            email = (row.get("Email") or "").strip()
+            model = (row.get("Model") or "").strip()
+            if "@" not in email or model not in CAR_DB:
+                continue
+            key = (email.lower(), model)
+            if key in seen:
+                continue
+            seen.add(key)
+            yield email, model
+
+
+def build_model_summary(model):
+    params = CAR_DB[model]
+    risk_gas, risk_hybrid = fmea_risk_costs(model) if REPORT_INPUTS["force_risk"] else (0, 0)
+    tco = calc_final_tco(
+        model, params["gas_price"], params["hybrid_price"],
+        REPORT_INPUTS["annual_km"], REPORT_INPUTS["years_to_keep"],
+        REPORT_INPUTS["gas_price"], params["battery"], risk_gas, risk_hybrid,
+    )
+
+    issues = []
+    for issue in CAR_FMEA.get(model, []):
+        issues.append({
+            "part": issue["part"], "years": issue["years"], "target": issue["target"],
+            "rpn": issue["s"] * issue["o"] * issue["d"],
+            "prob": issue["o"] * 10, "cost": issue["cost"],
+            "expected_cost": fmea_expected_cost(issue),
+            "check_guide": issue["check_guide"],
+        })
+    issues.sort(key=lambda i: i["rpn"], reverse=True)
+
+    return {
+        "model": model,
+        "gas_price": params["gas_price"], "hybrid_price": params["hybrid_price"],
+        "advice_gas": params["advice_gas"], "advice_hybrid": params["advice_hybrid"],
+        "tco_gas": int(tco["tco_gas"]), "tco_hybrid": int(tco["tco_hybrid"]),
+        "diff": int(tco["diff"]), "is_battery_included": tco["is_battery_included"],
+        "risk_gas": risk_gas, "risk_hybrid": risk_hybrid,
+        "issues": issues,
+    }
+
+
+def _collect_text(obj, chars):
+    if isinstance(obj, dict):
+        for v in obj.values():
+            _collect_text(v, chars)
+    elif isinstance(obj, (list, tuple)):
+        for v in obj:
+            _collect_text(v, chars)
+    else:
+        chars.update(str(obj))
+
+
+def subset_font(font_path, summaries, out_path):
+    # 報告只會用到：各車款摘要裡的字、本檔案裡的模板文字、email 的 ASCII
+    # 把整套繁中字型 (數萬字) 裁成幾百字的小檔，fpdf2 每份 PDF 載入就很快
+    chars = set(string.printable)
+    _collect_text(summaries, chars)
+    with open(__file__, encoding="utf-8") as f:
+        chars.update(f.read())
+
+    options = subset.Options()
+    options.notdef_outline = True
+    font = subset.load_font(font_path, options)
+    subsetter = subset.Subsetter(options)
+    subsetter.populate(text="".join(chars))
+    subsetter.subset(font)
+
+    subset.save_font(font, out_path, options)
+
+    # 先在主程序試載一次：壞字型在這裡就報錯，不會讓 Pool 無限重生 worker
+    FPDF().add_font("CJK", fname=out_path)
+    return out_path
+
+
+# ==========================================
+# 🖨️ PDF 繪製 (worker 程序)
+# ==========================================
+_WORKER = {}
+
+
+def _init_worker(font_path, summaries, out_dir):
+    # 每個 worker 只做一次：收下裁好的字型、各車款摘要、輸出目錄
+    _WORKER["font_path"] = font_path
+    _WORKER["summaries"] = summaries
+    _WORKER["out_dir"] = out_dir
+    _WORKER["issued"] = datetime.now().strftime("%Y-%m-%d")
+
+
+def _plain(text):
+    return EMOJI_RE.sub("", str(text)).strip()
+
+
+def _new_pdf():
+    pdf = FPDF(format="A4")
+    pdf.set_auto_page_break(auto=True, margin=15)
+    pdf.add_font("CJK", fname=_WORKER["font_path"])
+    pdf.add_page()
+    return pdf
+
+
+def _section(pdf, title):
+    pdf.ln(4)
+    pdf.set_font("CJK", size=14)
+    pdf.set_text_color(0, 82, 204)
+    pdf.cell(0, 9, title, new_x="LMARGIN", new_y="NEXT")
+    pdf.set_text_color(0, 0, 0)
+    pdf.set_font("CJK", size=11)
+
+
+def render_report(lead):
+    email, model = lead
+    s = _WORKER["summaries"][model]
+    pdf = _new_pdf()
+
+    pdf.set_font("CJK", size=18)
+    pdf.multi_cell(0, 10, REPORT_TITLE.format(model=model), new_x="LMARGIN", new_y="NEXT")
+    pdf.set_font("CJK", size=10)
+    pdf.set_text_color(110, 110, 110)
+    pdf.cell(0, 6, f"專屬報告：{email}　|　產出日期：{_WORKER['issued']}", new_x="LMARGIN", new_y="NEXT")
+    pdf.set_text_color(0, 0, 0)
+
+    # --- 1. TCO 試算 ---
+    years = REPORT_INPUTS["years_to_keep"]
+    _section(pdf, f"一、{years} 年總持有成本 (TCO)")
+    pdf.multi_cell(0, 7, (
+        f"試算條件：年行駛 {REPORT_INPUTS['annual_km']:,} km、持有 {years} 年、油價 {REPORT_INPUTS['gas_price']} 元。\n"
+        f"汽油版 (入手 ${s['gas_price']:,})：總成本 ${s['tco_gas']:,}\n"
+        f"油電版 (入手 ${s['hybrid_price']:,})：總成本 ${s['tco_hybrid']:,}"
+        + ("（含大電池更換）" if s["is_battery_included"] else "")
+    ), new_x="LMARGIN", new_y="NEXT")
+    winner = "油電版" if s["diff"] > 0 else "汽油版"
+    pdf.set_font("CJK", size=12)
+    pdf.multi_cell(0, 8, f"建議購買：{winner}，持有 {years} 年省下 ${abs(s['diff']):,}", new_x="LMARGIN", new_y="NEXT")
+
+    # --- 2. 購車建議 ---
+    _section(pdf, "二、工程師購車建議")
+    pdf.multi_cell(0, 7, f"汽油版：{_plain(s['advice_gas'])}\n油電版：{_plain(s['advice_hybrid'])}", new_x="LMARGIN", new_y="NEXT")
+
+    # --- 3. FMEA 避坑指南 ---
+    _section(pdf, "三、FMEA 避坑指南")
+    if not s["issues"]:
+        pdf.multi_cell(0, 7, "目前資料庫中此車款尚無列管通病，仍建議購車前做完整第三方檢測。", new_x="LMARGIN", new_y="NEXT")
+    for i, issue in enumerate(s["issues"], 1):
+        pdf.multi_cell(0, 7, (
+            f"{i}. {_plain(issue['part'])} (年份 {issue['years']})\n"
+            f"   RPN {issue['rpn']}｜發生率約 {issue['prob']}%｜維修 ${issue['cost']:,}｜期望損失 ${issue['expected_cost']:,}\n"
+            f"   {_plain(issue['check_guide'])}"
+        ), new_x="LMARGIN", new_y="NEXT")
+        pdf.ln(2)
+    if s["risk_gas"] or s["risk_hybrid"]:
+        pdf.multi_cell(0, 7, f"上述風險已計入 TCO：汽油版 +${s['risk_gas']:,} / 油電版 +${s['risk_hybrid']:,}", new_x="LMARGIN", new_y="NEXT")
+
+    pdf.ln(6)
+    pdf.set_font("CJK", size=9)
+    pdf.set_text_color(110, 110, 110)
+    pdf.multi_cell(0, 5, "本報告依公開行情與航太 FMEA 模型推估，實際車況請以現場檢查為準。", new_x="LMARGIN", new_y="NEXT")
+
+    # 清掉特殊字元後不同 email 可能撞名 (a+b@x.com / a_b@x.com)，加上 email 的短 hash 區分
+    email_hash = hashlib.sha1(email.lower().encode("utf-8")).hexdigest()[:8]
+    file_name = f"{UNSAFE_NAME_RE.sub('_', email)}_{email_hash}_{UNSAFE_NAME_RE.sub('_', model)}.pdf"
+    out_path = os.path.join(_WORKER["out_dir"], file_name)
+    pdf.output(out_path)
+    return out_path
+
+
+# ==========================================
+# 🕹️ 主程式
+# ==========================================
+def generate_reports(leads_file=LEADS_FILE, out_dir=OUTPUT_DIR, font_path=DEFAULT_FONT, workers=None):
+    # 字型相關的錯誤都要在開 pool 之前丟出；initializer 裡出錯的話 Pool 會一直重生 worker，整個卡住
+    if not os.path.exists(font_path):
+        raise FileNotFoundError(f"找不到字型檔：{font_path}")
+
+    models = {model for _, model in iter_leads(leads_file)}
+    if not models:
+        print("📂 名單為空，沒有報告要產生")
+        return 0
+
+    summaries = {model: build_model_summary(model) for model in models}
+    os.makedirs(out_dir, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(prefix="report_fonts_")
+
+    pending = threading.BoundedSemaphore(MAX_PENDING)
+    lock = threading.Lock()
+    stats = {"done": 0, "errors": []}
+    start = time.perf_counter()
+
+    # callback 在 pool 的結果執行緒裡跑：記帳後釋放一個排隊名額
+    def on_done(_):
+        with lock:
+            stats["done"] += 1
+            if stats["done"] % PROGRESS_EVERY == 0:
+                print(f"✅ 已產生 {stats['done']} 份報告 ({time.perf_counter() - start:.1f}s)")
+        pending.release()
+
+    def on_error(exc):
+        with lock:
+            stats["errors"].append(exc)
+        pending.release()
+
+    try:
+        subset_path = subset_font(font_path, summaries, os.path.join(tmp_dir, "subset" + os.path.splitext(font_path)[1]))
+        with Pool(workers, initializer=_init_worker, initargs=(subset_path, summaries, out_dir),
+                  maxtasksperchild=MAX_TASKS_PER_CHILD) as pool:
+            for lead in iter_leads(leads_file):
+                pending.acquire()
+                pool.apply_async(render_report, (lead,), callback=on_done, error_callback=on_error)
+            pool.close()
+            pool.join()
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    print(f"✅ 完成：共 {stats['done']} 份報告 ({time.perf_counter() - start:.1f}s)")
+    if stats["errors"]:
+        print(f"❌ {len(stats['errors'])} 份失敗，第一個錯誤：{stats['errors'][0]!r}")
+    return stats["done"]
+
+def main():
+    parser = argparse.ArgumentParser(description="為候補名單批次產生 PDF 行情報告")
+    parser.add_argument("--leads", default=LEADS_FILE, help="名單 CSV 路徑")
+    parser.add_argument("--out", default=OUTPUT_DIR, help="PDF 輸出目錄")
+    parser.add_argument("--font", default=DEFAULT_FONT, help="繁中字型檔 (TTF/OTF)")
+    parser.add_argument("--workers", type=int, default=None, help="worker 數量 (預設 CPU 核心數)")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.leads):
+        parser.error(f"找不到名單檔案：{args.leads}")
+    if not os.path.exists(args.font):
+        parser.error(f"找不到字型檔：{args.font} (請用 --font 指定支援繁中的字型)")
+
+    generate_reports(args.leads, args.out, args.font, args.workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+import os
+
+import pandas as pd
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+
+import listing_scan
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def test_page_run_does_not_modify_shared_listings(monkeypatch):
+    # 攔下 get_scored_listings 放進快取的那一份，跑完頁面後確認內容沒被改過
+    captured = []
+    freeze_frame = listing_scan.freeze_frame
+
+    def capture(df):
+        frozen = freeze_frame(df)
+        captured.append(frozen)
+        return frozen
+
+    monkeypatch.setattr(listing_scan, "freeze_frame", capture)
+    monkeypatch.chdir(APP_DIR)
+    st.cache_resource.clear()
+
+    at = AppTest.from_file(os.path.join(APP_DIR, "beta.py"), default_timeout=60).run()
+    assert not at.exception
+    assert len(captured) == 1
+    snapshot = captured[0].copy()
+
+    for model in ("RAV4", "Altis", "Corolla Cross"):
+        at.sidebar.selectbox[0].select(model).run()
+        assert not at.exception
+    at.sidebar.text_input(key="admin_check").input("uc0088").run()
+    assert not at.exception
+
+    assert len(captured) == 1   # 全程序只算一次
+    pd.testing.assert_frame_equal(captured[0], snapshot)
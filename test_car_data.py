@@ -0,0 +1,64 @@
+import math
+
+import pytest
+
+from car_data import CAR_DB, CAR_FMEA, calc_final_tco, fmea_risk_costs
+
+
+# --- beta.py 搬家前的原始公式 (逐字照抄)，確保搬到 car_data 後數字不變 ---
+def _legacy_fmea_costs(model):
+    fmea_cost_gas = 0
+    fmea_cost_hybrid = 0
+    for issue in CAR_FMEA.get(model, []):
+        expected_cost = int(issue['cost'] * (issue['o'] / 10.0))
+        if issue['target'] == 'both':
+            fmea_cost_gas += expected_cost
+            fmea_cost_hybrid += expected_cost
+        elif issue['target'] == 'gas':
+            fmea_cost_gas += expected_cost
+        elif issue['target'] == 'hybrid':
+            fmea_cost_hybrid += expected_cost
+    return fmea_cost_gas, fmea_cost_hybrid
+
+
+def _legacy_tco(selected_model, gas_car_price, hybrid_car_price, annual_km, years_to_keep,
+                gas_price, battery_cost, final_risk_g, final_risk_h):
+    def get_resale_value(initial_price, year, car_type):
+        k = 0.096 if car_type == 'gas' else 0.104
+        initial_drop = 0.82 if car_type == 'gas' else 0.80
+        if year <= 1: return initial_price * initial_drop
+        else: return (initial_price * initial_drop) * math.exp(-k * (year - 1))
+
+    tax_gas = 17410 if selected_model == "RAV4" else 11920
+    tax_hybrid = 22410 if selected_model == "RAV4" else 11920
+    total_km = annual_km * years_to_keep
+    is_battery_included = (total_km > 160000 or years_to_keep > 8)
+    g_resale_final = get_resale_value(gas_car_price, years_to_keep, 'gas')
+    h_resale_final = get_resale_value(hybrid_car_price, years_to_keep, 'hybrid')
+    tco_gas = (gas_car_price - g_resale_final) + ((total_km / 12.0) * gas_price) + (tax_gas * years_to_keep) + final_risk_g
+    tco_hybrid = (hybrid_car_price - h_resale_final) + ((total_km / 21.0) * gas_price) + (tax_hybrid * years_to_keep) + (battery_cost if is_battery_included else 0) + final_risk_h
+    return tco_gas, tco_hybrid, is_battery_included
+
+
+@pytest.mark.parametrize("model", list(CAR_DB))
+def test_fmea_risk_costs_match_legacy(model):
+    assert fmea_risk_costs(model) == _legacy_fmea_costs(model)
+
+
+@pytest.mark.parametrize("model", list(CAR_DB))
+@pytest.mark.parametrize("annual_km, years_to_keep, force_risk", [
+    (15000, 10, True), (5000, 1, False), (60000, 3, True), (20000, 8, True),
+])
+def test_calc_final_tco_matches_legacy(model, annual_km, years_to_keep, force_risk):
+    params = CAR_DB[model]
+    risk_g, risk_h = _legacy_fmea_costs(model) if force_risk else (0, 0)
+    args = (model, params["gas_price"], params["hybrid_price"], annual_km, years_to_keep,
+            31.0, params["battery"], risk_g, risk_h)
+
+    tco_gas, tco_hybrid, is_battery_included = _legacy_tco(*args)
+    tco = calc_final_tco(*args)
+
+    assert tco["tco_gas"] == pytest.approx(tco_gas)
+    assert tco["tco_hybrid"] == pytest.approx(tco_hybrid)
+    assert tco["diff"] == pytest.approx(tco_gas - tco_hybrid)
+    assert tco["is_battery_included"] == is_battery_included
@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from listing_scan import load_listings, score_listings, freeze_frame, family_comps, _family_of, RIDGE_LAMBDA
+
+SAMPLE_CSV = """﻿車款名稱,成本底價,備註
+TOYOTA ALTIS 白 (2012),166243,"里程: 166,243km, 評價: B, 來源: PDF"
+ALTIS ZRE211L-GEXEKR (2019),420000,"里程: 185,252KM, 評價: A, 來源: PDF"
+ALTIS HYBRID 白 (2019),383000,"里程: 97,876km, 評價: B+, 來源: PDF"
+MAZDA CX-5 白 (2018),520000,"里程: Unknown, 評價: , 來源: PDF"
+COROLLA CROSS ZVG10L-EHXNBR (2022),560000,"里程: 32,118KM, 評價: A, 來源: PDF"
+ALTIS ZWE211L-GEXVBR (2020),410000,"里程: 120,511KM, 評價: B, 來源: PDF"
+COROLLA CROSS ZSG10L-EHXNKR (2021),470000,"里程: 51,002KM, 評價: A, 來源: PDF"
+"""
+
+
+def _listings_frame(rng, n):
+    # 直接組出 load_listings 的輸出格式：兩個車系各 n 筆
+    family = np.repeat(["ALTIS", "RAV4"], n)
+    year = rng.integers(2010, 2025, 2 * n)
+    km = rng.integers(5000, 200000, 2 * n)
+    price = rng.integers(150000, 900000, 2 * n)
+    return pd.DataFrame({
+        "車款名稱": [f"{f} ({y})" for f, y in zip(family, year)],
+        "年份": year, "油電": rng.random(2 * n) < 0.3, "車系": family,
+        "價格": price, "里程": km, "評價": rng.choice(["A", "B"], 2 * n),
+    })
+
+
+def test_load_listings_parses_mileage_and_family(tmp_path):
+    path = tmp_path / "cars.csv"
+    path.write_text(SAMPLE_CSV, encoding="utf-8")
+    df = load_listings(path)
+
+    assert df["里程"].tolist()[:3] == [166243, 185252, 97876]   # km 與 KM 都要吃得到
+    assert np.isnan(df["里程"].iloc[3])                         # Unknown -> NaN
+    assert df["車系"].tolist() == ["ALTIS", "ALTIS", "ALTIS", "CX-5", "COROLLA CROSS", "ALTIS", "COROLLA CROSS"]
+    # 車名有 HYBRID，或底盤代碼是油電 (ZVG / ZWE)；ZRE / ZSG 是汽油版
+    assert df["油電"].tolist() == [False, False, True, False, True, True, False]
+    assert df["評價"].tolist() == ["B", "A", "B+", "", "A", "B", "A"]
+
+    valid = score_listings(df)["可用樣本"].tolist()
+    # 第一筆價格 == 里程 (PDF 解析錯位)、CX-5 沒有里程，都不納入
+    assert valid == [False, True, True, False, True, True, True]
+
+
+def test_family_of_keeps_real_model_names():
+    assert _family_of("MAZDA CX-30 白") == "CX-30"
+    assert _family_of("TOYOTA RAV4 白") == "RAV4"
+    assert _family_of("COROLLA CROSS 白") == "COROLLA CROSS"
+    assert _family_of("ALTIS ZWE211L-GEXVBR") == "ALTIS"
+
+
+def test_batched_solve_matches_per_family_solve():
+    rng = np.random.default_rng(0)
+    n = 60
+    df = _listings_frame(rng, n)
+    scored = score_listings(df)
+
+    for family in ("ALTIS", "RAV4"):
+        rows = scored[scored["車系"] == family]
+        X = np.column_stack([
+            np.ones(len(rows)), rows["車齡"], rows["里程"] / 10000.0,
+            rows["評價"].map({"A": 4.0, "B": 2.0}), rows["油電"].astype(float),
+        ])
+        y = np.log(rows["價格"].to_numpy(dtype=float))
+        ridge = np.eye(X.shape[1]) * RIDGE_LAMBDA
+        ridge[0, 0] = 1e-6
+        beta = np.linalg.solve(X.T @ X + ridge, X.T @ y)
+        expected = np.exp(X @ beta).round(-3)
+        np.testing.assert_allclose(rows["預估行情"].to_numpy(), expected)
+
+
+
+def test_frozen_frame_is_read_only_and_comps_are_copies():
+    scored = freeze_frame(score_listings(_listings_frame(np.random.default_rng(1), 20)))
+    snapshot = scored.copy()
+
+    with pytest.raises(ValueError):
+        scored.loc[scored.index[0], "預估行情"] = 0
+
+    comps = family_comps(scored, "ALTIS")
+    comps["預估行情"] = 0
+    comps["警示"] = "x"
+    pd.testing.assert_frame_equal(scored, snapshot)
@@ -0,0 +1,61 @@
+import glob
+import os
+
+import pytest
+
+import report_batch
+
+
+# 測試用字型：REPORT_TEST_FONT 環境變數，沒有的話找 matplotlib 附的 DejaVuSans
+def _find_font():
+    font = os.environ.get("REPORT_TEST_FONT")
+    if font and os.path.exists(font):
+        return font
+    try:
+        import matplotlib
+    except ImportError:
+        return None
+    font = os.path.join(os.path.dirname(matplotlib.__file__), "mpl-data", "fonts", "ttf", "DejaVuSans.ttf")
+    return font if os.path.exists(font) else None
+
+
+FONT = _find_font()
+
+LEADS_CSV = """Time,Model,Email,Status,Note
+2026-01-01 10:00:00,RAV4,amy@example.com,Waitlist,Waitlist
+2026-01-01 10:05:00,RAV4,Amy@Example.com,Waitlist,Waitlist
+2026-01-01 10:06:00,RAV4,amy@example.com,Waitlist,Waitlist
+2026-01-01 10:10:00,Altis,amy@example.com,Waitlist,Waitlist
+2026-01-01 10:20:00,Corolla Cross,a+b@x.com,Waitlist,Waitlist
+2026-01-01 10:21:00,Corolla Cross,a_b@x.com,Waitlist,Waitlist
+2026-01-01 10:30:00,ES300h,bob@example.com,Waitlist,Waitlist
+2026-01-01 10:40:00,RAV4,not-an-email,Waitlist,Waitlist
+"""
+
+
+@pytest.mark.skipif(FONT is None, reason="找不到測試用字型")
+def test_generate_reports_one_pdf_per_unique_lead(tmp_path):
+    leads = tmp_path / "leads.csv"
+    leads.write_text(LEADS_CSV, encoding="utf-8-sig")
+    out_dir = tmp_path / "reports"
+
+    done = report_batch.generate_reports(str(leads), str(out_dir), FONT, workers=2)
+
+    # (amy, RAV4)、(amy, Altis)、(a+b, Cross)、(a_b, Cross)；大小寫重複、ES300h、壞 email 都略過
+    pdfs = sorted(os.path.basename(p) for p in glob.glob(str(out_dir / "*.pdf")))
+    assert done == 4
+    assert len(pdfs) == 4
+    assert sum("RAV4" in p for p in pdfs) == 1
+    assert not any("ES300h" in p for p in pdfs)
+
+
+def test_generate_reports_rejects_bad_font_before_pool(tmp_path):
+    leads = tmp_path / "leads.csv"
+    leads.write_text(LEADS_CSV, encoding="utf-8-sig")
+    bad_font = tmp_path / "bad.ttf"
+    bad_font.write_text("not a font")
+
+    with pytest.raises(Exception):
+        report_batch.generate_reports(str(leads), str(tmp_path / "reports"), str(bad_font), workers=1)
+    with pytest.raises(FileNotFoundError):
+        report_batch.generate_reports(str(leads), str(tmp_path / "reports"), str(tmp_path / "missing.ttf"), workers=1)